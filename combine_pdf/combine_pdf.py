@@ -10,26 +10,47 @@ During merge the Merge button shows *Merging…* and switches to *Merged: <file>
 finished (background thread keeps UI responsive).
 """
 
+import asyncio
 import os
 import re
 import json
-import threading
+import stat
+from contextlib import ExitStack
 from datetime import datetime
-from functools import partial
+from io import BytesIO
+from typing import Final
 
+from textual import work
 from textual.app import App, ComposeResult
 from textual.widgets import Header, Footer, Button, ListView, ListItem, Static
 from textual.containers import Horizontal
 from textual.events import Paste
 from textual.reactive import reactive
-from pypdf import PdfReader, PdfWriter
 
-JSON_FILE = "combine_pdf.json"
+try:
+    from pypdf import PdfWriter
+except ImportError:  # pikepdf-only install
+    PdfWriter = None
 
-class PdfMergerApp(App):
-    """Textual TUI for merging PDFs and displaying current working directory."""
+try:  # optional libqpdf merge backend
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+try:  # optional fast JSON backend
+    import orjson
+except ImportError:
+    orjson = None
 
-    CSS = """
+JSON_FILE: Final = "combine_pdf.json"
+_JSON_ENCODING: Final = "utf-8"
+_TOKEN_RE: Final = re.compile(r'"([^"]+)"|(\S+)')
+# merge backend: "pypdf" or "pikepdf" (case-insensitive); unset picks whichever is installed
+PDF_BACKEND: Final = os.environ.get("PDF_BACKEND", "").strip().lower() or (
+    "pypdf" if PdfWriter is not None else "pikepdf" if pikepdf is not None else ""
+)
+
+_CSS: Final = """
 #cwd-display {
     dock: top;
     content-align: left middle;
@@ -45,6 +66,100 @@ class PdfMergerApp(App):
 }
 """
 
+
+def _dump_json(obj: list[str]) -> None:
+    """Write *obj* to JSON_FILE as indented UTF-8 JSON."""
+    if orjson is not None:
+        with open(JSON_FILE, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(JSON_FILE, "w", encoding=_JSON_ENCODING) as f:
+            json.dump(obj, f, ensure_ascii=False, indent=2)
+
+
+def _load_json() -> list[str]:
+    """Read the saved list back from JSON_FILE."""
+    if orjson is not None:
+        with open(JSON_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    with open(JSON_FILE, "r", encoding=_JSON_ENCODING) as f:
+        return json.load(f)
+
+
+def _merge_pypdf(pdf_paths: list[str]) -> BytesIO:
+    """Merge *pdf_paths* with pypdf and return the serialized result."""
+    if PdfWriter is None:
+        raise RuntimeError("PDF_BACKEND=pypdf but pypdf is not installed")
+    writer = PdfWriter()
+    try:
+        for p in pdf_paths:
+            writer.append(p, import_outline=False)
+        # share fonts/images that several inputs embed identically
+        writer.compress_identical_objects(remove_duplicates=True, remove_unreferenced=False)
+        buf = BytesIO()
+        writer.write(buf)
+        return buf
+    finally:
+        writer.close()
+
+
+def _merge_pikepdf(pdf_paths: list[str]) -> BytesIO:
+    """Merge *pdf_paths* with pikepdf (libqpdf) and return the serialized result."""
+    if pikepdf is None:
+        raise RuntimeError("PDF_BACKEND=pikepdf but pikepdf is not installed")
+    buf = BytesIO()
+    with pikepdf.Pdf.new() as merged, ExitStack() as sources:
+        # sources stay open until save, the merged pages still reference them
+        for p in pdf_paths:
+            src = sources.enter_context(pikepdf.Pdf.open(p))
+            merged.pages.extend(src.pages)
+        merged.save(buf)
+    return buf
+
+
+def _write_output(out: str, buf: BytesIO) -> None:
+    """Write the serialized PDF in *buf* to *out* with a single write call."""
+    with buf.getbuffer() as data, open(out, "wb") as f:
+        f.write(data)
+
+
+def _scan_paths(paths: list[str]) -> dict[str, bool]:
+    """Map each existing path to whether it is a directory (missing paths are omitted).
+
+    Lists a parent folder once with os.scandir when it holds two or more of the
+    paths; lone paths and names the listing cannot answer (".", "..", trailing
+    slashes, case differences, unreadable parents) use os.stat.
+    """
+    by_parent: dict[str, list[str]] = {}
+    for p in map(os.fspath, paths):
+        # no normpath: collapsing ".." lexically disagrees with the kernel across symlinks
+        by_parent.setdefault(os.path.dirname(p), []).append(p)
+    found: dict[str, bool] = {}
+    for parent, group in by_parent.items():
+        entries: dict[str, bool] = {}
+        if len(group) > 1:  # a single stat is cheaper than listing the folder
+            try:
+                with os.scandir(parent or os.curdir) as it:
+                    entries = {e.name: e.is_dir() for e in it if e.is_dir() or e.is_file()}
+            except OSError:
+                pass
+        for p in group:
+            name = os.path.basename(p)
+            if name in entries:
+                found[p] = entries[name]
+                continue
+            try:
+                found[p] = stat.S_ISDIR(os.stat(p).st_mode)
+            except OSError:
+                pass
+    return found
+
+
+class PdfMergerApp(App):
+    """Textual TUI for merging PDFs and displaying current working directory."""
+
+    CSS = _CSS
+
     files: list[str] = reactive([])
     cwd: str = reactive(os.getcwd())  # track current directory
 
@@ -71,119 +186,190 @@ class PdfMergerApp(App):
         )
         yield Footer()
 
+    def on_mount(self) -> None:
+        # widgets looked up once; the layout never replaces them
+        self._lv = self.query_one(ListView)
+        self._cwd_static = self.query_one("#cwd-display", Static)
+        self._merge_btn = self.query_one("#merge-button", Button)
+        self._save_btn = self.query_one("#save-button", Button)
+        self._load_btn = self.query_one("#load-button", Button)
+        self._items: list[ListItem] = []  # ListView rows, parallel to self.files
+        self._labels: list[Static] = []  # each row's Static, usable before it is mounted
+        self._marked: int | None = None  # row drawn as "> path"
+        self._seen: set[str] = set(self.files)  # paths already in self.files
+
     # ─── Helper: refresh listview ────────────────────────────────────────────
+    def _row_label(self, i: int) -> str:
+        return f"> {self.files[i]}" if i == self._marked else f"  {self.files[i]}"
+
+    def _new_item(self, i: int) -> ListItem:
+        label = Static(self._row_label(i))
+        self._labels.append(label)
+        item = ListItem(label)
+        if i == self._marked:
+            item.styles.reverse = True
+        return item
+
+    def _render_row(self, i: int) -> None:
+        self._labels[i].update(self._row_label(i))
+        self._items[i].styles.reverse = i == self._marked
+
+    def _mark(self, new_index: int | None) -> None:
+        """Move the "> " marker to *new_index*, redrawing only the old row."""
+        old, self._marked = self._marked, new_index
+        if old is not None and old != new_index:
+            self._render_row(old)
+
+    def _focus_row(self, index: int | None) -> None:
+        if index is not None:
+            self._lv.index = index
+            self._lv.focus()
+
     def _refresh_list(self, new_index: int | None = None) -> None:
-        lv = self.query_one(ListView)
+        """Rebuild every row (used when the whole list is replaced)."""
+        lv = self._lv
         lv.clear()
-        for i, path in enumerate(self.files):
-            label = f"> {path}" if i == new_index else f"  {path}"
-            item = ListItem(Static(label))
-            if i == new_index:
-                item.styles.reverse = True
+        self._marked = new_index
+        self._labels = []
+        self._items = [self._new_item(i) for i in range(len(self.files))]
+        for item in self._items:
+            lv.append(item)
+        self._focus_row(new_index)
+
+    def _append_rows(self, new_index: int | None = None) -> None:
+        """Append rows only for files added since the last update."""
+        lv = self._lv
+        self._mark(new_index)
+        for i in range(len(self._items), len(self.files)):
+            item = self._new_item(i)
+            self._items.append(item)
             lv.append(item)
-        if new_index is not None:
-            lv.index = new_index
-            lv.focus()
+        self._focus_row(new_index)
+
+    def _swap_rows(self, i: int, j: int) -> None:
+        """Redraw rows *i* and *j* after swapping them in self.files; select *j*."""
+        self._mark(j)
+        self._render_row(i)
+        self._render_row(j)
+        self._focus_row(j)
 
     def _update_cwd_display(self) -> None:
-        self.query_one("#cwd-display", Static).update(f"Current directory: {self.cwd}")
+        cwd = self.cwd
+        self._cwd_static.update(f"Current directory: {cwd}")
 
     # ─── Paste / Drop ────────────────────────────────────────────────────────
     async def on_paste(self, event: Paste) -> None:
         txt = event.text.strip()
-        pattern = r'"([^\"]+)"|(\S+)'
-        tokens = [q or u for q, u in re.findall(pattern, txt)]
+        tokens = [q or u for q, u in _TOKEN_RE.findall(txt)]
         if not tokens:
             return
-        # Handle directories (take last dir in tokens if multiple)
-        dir_tokens = [t for t in tokens if os.path.isdir(t)]
-        if dir_tokens:
-            os.chdir(dir_tokens[-1])
-            self.cwd = os.getcwd()
-            self._update_cwd_display()
-            # remove dir tokens from list so they are not treated as PDFs
-            tokens = [t for t in tokens if t not in dir_tokens]
-        # Add PDF files
-        new = [p for p in tokens if p.lower().endswith(".pdf")]
-        if new:
-            # store absolute paths to be independent of cwd changes
-            abs_new = [os.path.abspath(p) for p in new]
-            self.files.extend(abs_new)
-            self._refresh_list(len(self.files) - len(abs_new))
+        # PDF names need no filesystem check; only the rest may be folders
+        new: list[str] = []
+        others: list[str] = []
+        for t in tokens:
+            (new if t[-4:].lower() == ".pdf" else others).append(t)
+        # the cwd change and the new rows share one layout pass
+        with self.batch_update():
+            # Handle directories (take last dir in tokens if multiple)
+            if others:
+                found = _scan_paths(others)
+                dir_tokens = [t for t in others if found.get(t)]
+                if dir_tokens:
+                    os.chdir(dir_tokens[-1])
+                    self.cwd = os.getcwd()
+                    self._update_cwd_display()
+            # Add PDF files
+            if new:
+                # store absolute paths to be independent of cwd changes
+                # and skip paths that are already listed
+                abs_new: list[str] = []
+                for p in new:
+                    ap = os.path.abspath(p)
+                    if ap not in self._seen:
+                        self._seen.add(ap)
+                        abs_new.append(ap)
+                if abs_new:
+                    self.files.extend(abs_new)
+                    self._append_rows(len(self.files) - len(abs_new))
 
     # ─── Reorder ----------------------------------------------------------------
     def action_move_up(self) -> None:
-        lv = self.query_one(ListView)
-        i = lv.index
+        i = self._lv.index
         if i > 0:
             self.files[i - 1], self.files[i] = self.files[i], self.files[i - 1]
-            self._refresh_list(i - 1)
+            self._swap_rows(i, i - 1)
 
     def action_move_down(self) -> None:
-        lv = self.query_one(ListView)
-        i = lv.index
+        i = self._lv.index
         if i < len(self.files) - 1:
             self.files[i + 1], self.files[i] = self.files[i], self.files[i + 1]
-            self._refresh_list(i + 1)
+            self._swap_rows(i, i + 1)
 
     # ─── Save / Load ------------------------------------------------------------
     def action_save_list(self) -> None:
-        btn = self.query_one("#save-button", Button)
+        btn = self._save_btn
         try:
-            with open(JSON_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.files, f, ensure_ascii=False, indent=2)
+            _dump_json(self.files)
             btn.label = f"Saved: {JSON_FILE}"
         except Exception as e:
             btn.label = f"Save err: {e}"
         btn.refresh(layout=True)
 
     def action_load_list(self) -> None:
-        btn = self.query_one("#load-button", Button)
+        btn = self._load_btn
         try:
-            with open(JSON_FILE, "r", encoding="utf-8") as f:
-                loaded = json.load(f)
+            loaded = _load_json()
         except Exception as e:
             btn.label = f"Load err: {e}"
             btn.refresh(layout=True)
             return
-        missing = [p for p in loaded if not os.path.exists(p)]
+        found = _scan_paths(loaded)
+        missing = [p for p in loaded if p not in found]
         if missing:
             btn.label = f"Missing: {os.path.basename(missing[0])}"
             btn.refresh(layout=True)
             return
-        self.files = loaded
+        self.files = list(dict.fromkeys(loaded))
+        self._seen = set(self.files)
         self._refresh_list(0 if self.files else None)
         btn.label = f"Loaded: {JSON_FILE}"
         btn.refresh(layout=True)
 
     # ─── Merge ------------------------------------------------------------------
     def action_merge(self) -> None:
-        btn = self.query_one("#merge-button", Button)
-        if not self.files:
+        btn = self._merge_btn
+        if not self.files or btn.disabled:  # nothing to merge, or a merge is running
             self.bell(); return
+        btn.disabled = True
         btn.label = "Merging…"
         btn.refresh(layout=True)
-        threading.Thread(target=self._do_merge, args=(self.files.copy(),), daemon=True).start()
+        self._merge(self.files.copy())
 
-    def _do_merge(self, pdf_paths: list[str]) -> None:
-        writer = PdfWriter()
+    @work(group="merge")
+    async def _merge(self, pdf_paths: list[str]) -> None:
+        btn = self._merge_btn
         try:
-            for p in pdf_paths:
-                reader = PdfReader(p)
-                for pg in reader.pages:
-                    writer.add_page(pg)
-            out = f"combined-{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-            with open(out, "wb") as f:
-                writer.write(f)
+            out = await asyncio.to_thread(self._do_merge, pdf_paths)
+            btn.label = f"Merged: {out}"
         except Exception as e:
-            self.call_from_thread(partial(self._merge_finished, error=str(e)))
-            return
-        self.call_from_thread(partial(self._merge_finished, output=out))
-
-    def _merge_finished(self, output: str | None = None, error: str | None = None) -> None:
-        btn = self.query_one("#merge-button", Button)
-        btn.label = f"Error: {error}" if error else f"Merged: {output}"
+            btn.label = f"Error: {e}"
+        finally:
+            btn.disabled = False
         btn.refresh(layout=True)
 
+    def _do_merge(self, pdf_paths: list[str]) -> str:
+        if not PDF_BACKEND:
+            raise RuntimeError("No PDF backend installed (install pypdf or pikepdf)")
+        if PDF_BACKEND == "pikepdf":
+            buf = _merge_pikepdf(pdf_paths)
+        elif PDF_BACKEND == "pypdf":
+            buf = _merge_pypdf(pdf_paths)
+        else:
+            raise RuntimeError(f"Unknown PDF_BACKEND: {PDF_BACKEND}")
+        n = datetime.now()
+        out = f"combined-{n.year:04d}{n.month:02d}{n.day:02d}{n.hour:02d}{n.minute:02d}{n.second:02d}.pdf"
+        _write_output(out, buf)
+        return out
+
 if __name__ == "__main__":
     PdfMergerApp().run()
\ No newline at end of file